@@ -1,25 +1,84 @@
 #################################### IMPORTS ###################################
 
+import os
 import unittest
 
+import numpy as np
+
 import pygame
-from pygame import draw
+from pygame import draw, surfarray
 from pygame.locals import SRCALPHA
 from pygame.tests import test_utils
 
 
 def get_border_values(surface, width, height):
-    """Returns a list containing lists with the values of the surface's
-    borders.
+    """Returns a list containing arrays with the RGBA values of the surface's
+    borders. Surfaces without per pixel alpha are given an alpha of 255.
+    """
+    pixels = surfarray.pixels3d(surface)
+    alpha = None
+    if surface.get_masks()[3]:
+        alpha = surfarray.pixels_alpha(surface)
+
+    borders = []
+    for x, y in ((slice(0, width), 0), (0, slice(0, height)),
+                 (width - 1, slice(0, height)), (slice(0, width), height - 1)):
+        rgb = pixels[x, y]
+        if alpha is None:
+            border_alpha = np.full(len(rgb), 255, dtype=np.uint8)
+        else:
+            border_alpha = alpha[x, y]
+        # column_stack copies the borders out of the views, so the surface
+        # lock they hold is released on return.
+        borders.append(np.column_stack((rgb, border_alpha)))
+
+    # top, left, right and bottom borders
+    return borders
+
+
+def border_is_color(border, color):
+    """Returns True if every pixel of the RGBA border array is the given
+    color. A color without alpha is taken as opaque.
+    """
+    rgba = tuple(color) + (255,) * (4 - len(color))
+    return bool((border == np.asarray(rgba)).all())
+
+
+def rect_is_color(surface, rect, color):
+    """Returns True if every pixel of the per pixel alpha surface within rect
+    is the given RGBA color.
+    """
+    x, y, w, h = rect
+    pixels = surfarray.pixels3d(surface)[x:x + w, y:y + h]
+    alpha = surfarray.pixels_alpha(surface)[x:x + w, y:y + h]
+
+    # The views (and the surface lock they hold) are released on return.
+    return bool((pixels == np.asarray(color[:3])).all() and
+                (alpha == color[3]).all())
+
+
+def map_color(surface, color):
+    """Returns color mapped to the surface's pixel format as an unsigned 32
+    bit value.
+    """
+    # map_rgb() can return the mapped color as a signed integer.
+    return surface.map_rgb(color) & 0xFFFFFFFF
+
+
+def border_match(surface, packed):
+    """Returns a tuple telling, for the top, left, right and bottom borders of
+    the 32 bit surface, if the border contains the mapped color packed.
     """
-    border_top = [surface.get_at((x, 0)) for x in range(width)]
-    border_left = [surface.get_at((0, y)) for y in range(height)]
-    border_right = [
-        surface.get_at((width - 1, y)) for y in range(height)]
-    border_bottom = [
-        surface.get_at((x, height - 1)) for x in range(width)]
+    width, height = surface.get_size()
+    pitch = surface.get_pitch() // 4
+    buf = np.frombuffer(surface.get_buffer(), dtype=np.uint32)
+    pixels = buf.reshape(height, pitch)[:, :width]
 
-    return [border_top, border_left, border_right, border_bottom]
+    # The buffer (and the surface lock it holds) is released on return.
+    return (bool((pixels[0] == packed).any()),
+            bool((pixels[:, 0] == packed).any()),
+            bool((pixels[:, -1] == packed).any()),
+            bool((pixels[-1] == packed).any()))
 
 
 class DrawEllipseTest(unittest.TestCase):
@@ -38,68 +97,94 @@ class DrawEllipseTest(unittest.TestCase):
         sizes = [(4, 4), (5, 4), (4, 5), (5, 5)]
         color = (1, 13, 24, 255)
 
-        def same_size(width, height, border_width):
-            """Test for ellipses with the same size as the surface."""
-            surface = pygame.Surface((width, height))
+        # One 32 bit surface per size, cleared before each ellipse is drawn.
+        surfaces = dict((size, pygame.Surface(size, 0, 32)) for size in sizes)
+        packed = map_color(surfaces[sizes[0]], color)
 
+        def same_size(surface, width, height, border_width):
+            """Test for ellipses with the same size as the surface."""
             draw.ellipse(
-                surface, color, (0, 0, width, height), border_width)            
+                surface, color, (0, 0, width, height), border_width)
 
             # For each of the four borders check if it contains the color
-            borders = get_border_values(surface, width, height)
-            for border in borders:
-                self.assertTrue(color in border)
+            self.assertTrue(all(border_match(surface, packed)))
 
-        def not_same_size(width, height, border_width, left, top):
+        def not_same_size(surface, width, height, border_width, left, top):
             """Test for ellipses that aren't the same size as the surface."""
-            surface = pygame.Surface((width, height))
-
             draw.ellipse(surface, color, (left, top, width - 1, height - 1),
                          border_width)
 
-            borders = get_border_values(surface, width, height)
-
             # Check if two sides of the ellipse are touching the border
-            sides_touching = [
-                color in border for border in borders].count(True)
+            sides_touching = border_match(surface, packed).count(True)
             self.assertEqual(sides_touching, 2)
 
         for width, height in sizes:
+            surface = surfaces[(width, height)]
             for border_width in (0, 1):
-                same_size(width, height, border_width)
+                surface.fill((0, 0, 0, 0))
+                same_size(surface, width, height, border_width)
                 for left, top in left_top:
-                    not_same_size(width, height, border_width, left, top)
+                    surface.fill((0, 0, 0, 0))
+                    not_same_size(surface, width, height, border_width,
+                                  left, top)
 
 
 def lines_set_up():
     """Returns the colors and surfaces needed in the tests for draw.line,
     draw.aaline, draw.lines and draw.aalines.
+
+    A display mode must already be set, as convert_alpha() needs one.
     """
     colors = [
             (0, 0, 0), (255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0),
             (255, 0, 255), (0, 255, 255), (255, 255, 255)]
 
     sizes = [(49, 49), (50, 50)]
-    depths = [16, 32]
+    # aaline() and aalines() only support 24 and 32 bit surfaces, and
+    # 32 bit surfaces are cleared on the fast fill path between uses.
+    depths = [32]
     surfaces = []
     for size in sizes:
         for depth in depths:
             # Create each possible surface type
-            surface_default = pygame.display.set_mode(size, 0, depth)
+            surface_default = pygame.Surface(size, 0, depth)
             surface_default_SRCALPHA = pygame.Surface(size, SRCALPHA, depth)
             surface_alpha = surface_default.convert_alpha()
             surface_alpha_SRCALPHA = surface_default_SRCALPHA.convert_alpha()
 
             surfaces.extend([surface_default, surface_alpha,
-                             surface_alpha_SRCALPHA, surface_alpha_SRCALPHA])
+                             surface_default_SRCALPHA, surface_alpha_SRCALPHA])
 
     return colors, surfaces
 
 
+def border_matches(surface, color, draw_lines):
+    """Draws (aa)lines around the border of the given surface and returns a
+    list telling, for each border, if it only contains the given color.
+    """
+    width = surface.get_width()
+    height = surface.get_height()
+    points = [(0, 0), (width - 1, 0), (width - 1, height - 1),
+              (0, height - 1)]
+
+    draw_lines(surface, color, True, points)
+
+    borders = get_border_values(surface, width, height)
+    return [border_is_color(border, color) for border in borders]
+
+
 class DrawLineTest(unittest.TestCase):
     """Class for testing line(), aaline(), lines() and aalines().
     """
 
+    @classmethod
+    def setUpClass(cls):
+        # None of the tests need a real window, only a display mode for
+        # convert_alpha(). The surfaces are cleared between uses, not
+        # recreated.
+        pygame.display.set_mode((1, 1), 0, 32)
+        cls._colors, cls._surfaces = lines_set_up()
+
     def test_line_color(self):
         """|tags: ignore|
 
@@ -115,10 +200,13 @@ class DrawLineTest(unittest.TestCase):
             return surface.get_at((0, 0)) == color
 
         for draw_line in [draw.line, draw.aaline]:
-            colors, surfaces = lines_set_up()
+            colors, surfaces = self._colors, self._surfaces
             for surface in surfaces:
                 for color in colors:
-                    self.assertTrue(line_is_color(surface, color, draw_line))
+                    surface.fill((0, 0, 0, 0))
+                    msg = "%s, %s" % (color, surface)
+                    self.assertTrue(line_is_color(surface, color, draw_line),
+                                    msg)
 
     def test_line_gaps(self):
         """|tags: ignore|
@@ -136,69 +224,119 @@ class DrawLineTest(unittest.TestCase):
 
             draw_line(surface, color, (0, 0), (width - 1, 0))
 
-            colors = [surface.get_at((x, 0)) for x in range(width)]
-
-            return len(colors) == colors.count(color)
+            packed = map_color(surface, color)
+            row = surfarray.pixels2d(surface)[:width, 0]
+            return np.count_nonzero(row != packed) == 0
 
         for draw_line in [draw.line, draw.aaline]:
-            _, surfaces = lines_set_up()
+            surfaces = self._surfaces
             for surface in surfaces:
+                surface.fill((0, 0, 0, 0))
                 self.assertTrue(line_has_gaps(surface, draw_line))
 
     def test_lines_color(self):
         """|tags: ignore|
 
-        Tests if the lines drawn with lines_are_color() are the correct color.
+        Tests if the lines drawn with border_matches() are the correct color.
         """
-        def lines_are_color(surface, color, draw_lines):
-            """Draws (aa)lines around the border of the given surface and
-            checks if all borders of the surface only contain the given color.
-            """
-            width = surface.get_width()
-            height = surface.get_height()
-            points = [(0, 0), (width - 1, 0), (width - 1, height - 1),
-                      (0, height - 1)]
-
-            draw_lines(surface, color, True, points)
-
-            borders = get_border_values(surface, width, height)
-            return [all(c == color for c in border) for border in borders]
-
         for draw_lines in [draw.lines, draw.aalines]:
-            colors, surfaces = lines_set_up()
+            colors, surfaces = self._colors, self._surfaces
             for surface in surfaces:
                 for color in colors:
-                    in_border = lines_are_color(surface, color, draw_lines)
-                    self.assertTrue(all(in_border))
+                    surface.fill((0, 0, 0, 0))
+                    in_border = border_matches(surface, color, draw_lines)
+                    msg = "%s, %s" % (color, surface)
+                    self.assertTrue(all(in_border), msg)
 
     def test_lines_gaps(self):
         """|tags: ignore|
 
-        Tests if the lines drawn with lines_have_gaps() contain any gaps.
+        Tests if the lines drawn with border_matches() contain any gaps.
 
         See: #512
         """
+        color = (255, 255, 255)
+        for draw_lines in [draw.lines, draw.aalines]:
+            surfaces = self._surfaces
+            for surface in surfaces:
+                surface.fill((0, 0, 0, 0))
+                no_gaps = border_matches(surface, color, draw_lines)
+                self.assertTrue(all(no_gaps))
 
-        def lines_have_gaps(surface, draw_lines):
-            """Draws (aa)lines around the border of the given surface and
-            checks if all borders of the surface contain any gaps.
-            """
-            width = surface.get_width()
-            height = surface.get_height()
-            color = (255, 255, 255)
-            points = [(0, 0), (width - 1, 0), (width - 1, height - 1),
-                      (0, height - 1)]
 
-            draw_lines(surface, color, True, points)
+def pts_to_index(pts):
+    """Returns the given (x, y) points as a pair of x and y index arrays."""
+    coords = np.fromiter((c for pt in pts for c in pt), dtype=np.intp)
+    return coords[0::2], coords[1::2]
 
-            borders = get_border_values(surface, width, height)
-            return [all(c == color for c in border) for border in borders]
 
-        for draw_lines in [draw.lines, draw.aalines]:
-            _, surfaces = lines_set_up()
-            for surface in surfaces:
-                no_gaps = lines_have_gaps(surface, draw_lines)
-                self.assertTrue(all(no_gaps))
+def pts_colors(surface, pts):
+    """Returns an array with the RGBA color of each of the given points of a
+    per pixel alpha surface.
+    """
+    xs, ys = pts_to_index(pts)
+    rgb = surfarray.pixels3d(surface)[xs, ys]
+    alpha = surfarray.pixels_alpha(surface)[xs, ys]
+    return np.column_stack((rgb, alpha))
+
+
+def line_points(start, end):
+    """Yields the points of the 1 pixel wide line from start to end, in the
+    same order and with the same error term stepping as draw.line().
+    """
+    x, y = start
+    deltax = end[0] - x
+    deltay = end[1] - y
+    signx = -1 if deltax < 0 else 1
+    signy = -1 if deltay < 0 else 1
+    deltax = signx * deltax + 1
+    deltay = signy * deltay + 1
+    major = (signx, 0)
+    minor = (0, signy)
+
+    if deltax < deltay:  # swap axis if rise > run
+        deltax, deltay = deltay, deltax
+        major, minor = minor, major
+
+    error = 0
+    for _ in range(deltax):
+        yield x, y
+        x += major[0]
+        y += major[1]
+        error += deltay
+        if error >= deltax:
+            error -= deltax
+            x += minor[0]
+            y += minor[1]
+
+
+def line_mask(size, start, end, width=1):
+    """Returns a boolean array of the given surface size that is True where
+    draw.line() is expected to color a pixel.
+
+    Wide lines are drawn as parallel 1 pixel lines offset by +1, -1, +2, ...
+    across the minor axis. Lines that get clipped are not supported.
+    """
+    mask = np.zeros(size, dtype=np.bool_)
+    xinc = yinc = 0
+    if abs(start[0] - end[0]) > abs(start[1] - end[1]):
+        yinc = 1
+    else:
+        xinc = 1
+
+    offsets = [0]
+    for loop in range(1, width, 2):
+        offsets.append(loop // 2 + 1)
+        if loop + 1 < width:
+            offsets.append(-(loop // 2 + 1))
+
+    for offset in offsets:
+        dx = xinc * offset
+        dy = yinc * offset
+        for x, y in line_points((start[0] + dx, start[1] + dy),
+                                (end[0] + dx, end[1] + dy)):
+            mask[x, y] = True
+    return mask
 
 
 class DrawModuleTest(unittest.TestCase):
@@ -216,17 +354,14 @@ class DrawModuleTest(unittest.TestCase):
         rect = pygame.Rect(10, 10, 25, 20)
         drawn = draw.rect(self.surf, self.color, rect, 0)
 
-        self.assert_(drawn == rect)
+        self.assertEqual(drawn, rect)
 
         # Should be colored where it's supposed to be
-        for pt in test_utils.rect_area_pts(rect):
-            color_at_pt = self.surf.get_at(pt)
-            self.assert_(color_at_pt == self.color)
+        self.assertTrue(rect_is_color(self.surf, rect, self.color))
 
         # And not where it shouldn't
-        for pt in test_utils.rect_outer_bounds(rect):
-            color_at_pt = self.surf.get_at(pt)
-            self.assert_(color_at_pt != self.color)
+        colors = pts_colors(self.surf, test_utils.rect_outer_bounds(rect))
+        self.assertTrue((colors != self.color).any(axis=1).all())
 
         # Issue #310: Cannot draw rectangles that are 1 pixel high
         bgcolor = pygame.Color('black')
@@ -234,21 +369,19 @@ class DrawModuleTest(unittest.TestCase):
         hrect = pygame.Rect(1, 1, self.surf_w - 2, 1)
         vrect = pygame.Rect(1, 3, 1, self.surf_h - 4)
         drawn = draw.rect(self.surf, self.color, hrect, 0)
-        self.assert_(drawn == hrect)
+        self.assertEqual(drawn, hrect)
         x, y = hrect.topleft
         w, h = hrect.size
         self.assertEqual(self.surf.get_at((x - 1, y)), bgcolor)
         self.assertEqual(self.surf.get_at((x + w, y)), bgcolor)
-        for i in range(x, x + w):
-            self.assertEqual(self.surf.get_at((i, y)), self.color)
+        self.assertTrue(rect_is_color(self.surf, hrect, self.color))
         drawn = draw.rect(self.surf, self.color, vrect, 0)
         self.assertEqual(drawn, vrect)
         x, y = vrect.topleft
         w, h = vrect.size
         self.assertEqual(self.surf.get_at((x, y - 1)), bgcolor)
         self.assertEqual(self.surf.get_at((x, y + h)), bgcolor)
-        for i in range(y, y + h):
-            self.assertEqual(self.surf.get_at((x, i)), self.color)
+        self.assertTrue(rect_is_color(self.surf, vrect, self.color))
 
     def test_rect__one_pixel_lines(self):
         # __doc__ (as of 2008-06-25) for pygame.draw.rect:
@@ -258,17 +391,15 @@ class DrawModuleTest(unittest.TestCase):
         rect = pygame.Rect(10, 10, 56, 20)
 
         drawn = draw.rect(self.surf, self.color, rect, 1)
-        self.assert_(drawn == rect)
+        self.assertEqual(drawn, rect)
 
         # Should be colored where it's supposed to be
-        for pt in test_utils.rect_perimeter_pts(drawn):
-            color_at_pt = self.surf.get_at(pt)
-            self.assert_(color_at_pt == self.color)
+        colors = pts_colors(self.surf, test_utils.rect_perimeter_pts(drawn))
+        self.assertTrue((colors == self.color).all())
 
         # And not where it shouldn't
-        for pt in test_utils.rect_outer_bounds(drawn):
-            color_at_pt = self.surf.get_at(pt)
-            self.assert_(color_at_pt != self.color)
+        colors = pts_colors(self.surf, test_utils.rect_outer_bounds(drawn))
+        self.assertTrue((colors != self.color).any(axis=1).all())
 
     def test_line(self):
 
@@ -279,16 +410,16 @@ class DrawModuleTest(unittest.TestCase):
 
         # (l, t), (l, t)
         drawn = draw.line(self.surf, self.color, (1, 0), (200, 0))
-        self.assert_(drawn.right == 201,
-                     "end point arg should be (or at least was) inclusive")
+        self.assertEqual(drawn.right, 201,
+                         "end point arg should be (or at least was) inclusive")
 
         # Should be colored where it's supposed to be
-        for pt in test_utils.rect_area_pts(drawn):
-            self.assert_(self.surf.get_at(pt) == self.color)
+        colors = pts_colors(self.surf, test_utils.rect_area_pts(drawn))
+        self.assertTrue((colors == self.color).all())
 
         # And not where it shouldn't
-        for pt in test_utils.rect_outer_bounds(drawn):
-            self.assert_(self.surf.get_at(pt) != self.color)
+        colors = pts_colors(self.surf, test_utils.rect_outer_bounds(drawn))
+        self.assertTrue((colors != self.color).any(axis=1).all())
 
         # Line width greater that 1
         line_width = 2
@@ -303,32 +434,33 @@ class DrawModuleTest(unittest.TestCase):
                  (a, b), (b, a), (a, c), (c, a),
                  (a, e), (e, a), (a, f), (f, a),
                  (a, a),]
-        for p1, p2 in lines:
+        # Each case gets its own surf_size strip of one tall surface, so
+        # the surface is only cleared once and verified with one view.
+        strip_h = self.surf_h
+        surf = pygame.Surface((self.surf_w, strip_h * len(lines)), SRCALPHA)
+        surf.fill((0, 0, 0, 0))
+        expected = np.zeros(surf.get_size(), dtype=np.bool_)
+        cases = []
+        for i, (p1, p2) in enumerate(lines):
             msg = "%s - %s" % (p1, p2)
+            top = i * strip_h
+            expected[:, top:top + strip_h] = line_mask(self.surf_size, p1, p2,
+                                                      line_width)
+            p1 = (p1[0], p1[1] + top)
+            p2 = (p2[0], p2[1] + top)
             if p1[0] <= p2[0]:
                 plow = p1
                 phigh = p2
             else:
                 plow = p2
                 phigh = p1
-            self.surf.fill((0, 0, 0))
-            rec = draw.line(self.surf, (255, 255, 255), p1, p2, line_width)
+            rec = draw.line(surf, (255, 255, 255), p1, p2, line_width)
             xinc = yinc = 0
             if abs(p1[0] - p2[0]) > abs(p1[1] - p2[1]):
                 yinc = 1
             else:
                 xinc = 1
-            for i in range(line_width):
-                p = (p1[0] + xinc * i, p1[1] + yinc * i)
-                self.assert_(self.surf.get_at(p) == (255, 255, 255), msg)
-                p = (p2[0] + xinc * i, p2[1] + yinc * i)
-                self.assert_(self.surf.get_at(p) == (255, 255, 255), msg)
-            p = (plow[0] - 1, plow[1])
-            self.assert_(self.surf.get_at(p) == (0, 0, 0), msg)
-            p = (plow[0] + xinc * line_width, plow[1] + yinc * line_width)
-            self.assert_(self.surf.get_at(p) == (0, 0, 0), msg)
-            p = (phigh[0] + xinc * line_width, phigh[1] + yinc * line_width)
-            self.assert_(self.surf.get_at(p) == (0, 0, 0), msg)
+            cases.append((msg, p1, p2, plow, phigh, xinc, yinc))
             if p1[0] < p2[0]:
                 rx = p1[0]
             else:
@@ -339,8 +471,26 @@ class DrawModuleTest(unittest.TestCase):
                 ry = p2[1]
             w = abs(p2[0] - p1[0]) + 1 + xinc * (line_width - 1)
             h = abs(p2[1] - p1[1]) + 1 + yinc * (line_width - 1)
-            msg += ", %s" % (rec,)
-            self.assert_(rec == (rx, ry, w, h), msg)
+            self.assertEqual(rec, (rx, ry, w, h), msg + ", %s" % (rec,))
+
+        pixels = surfarray.pixels3d(surf)
+        for msg, p1, p2, plow, phigh, xinc, yinc in cases:
+            # The line_width pixels across each end point are colored
+            xend = xinc * (line_width - 1) + 1
+            yend = yinc * (line_width - 1) + 1
+            for p in (p1, p2):
+                strip = pixels[p[0]:p[0] + xend, p[1]:p[1] + yend]
+                self.assertTrue((strip == 255).all(), msg)
+            xs = [plow[0] - 1, plow[0] + xinc * line_width,
+                  phigh[0] + xinc * line_width]
+            ys = [plow[1], plow[1] + yinc * line_width,
+                  phigh[1] + yinc * line_width]
+            self.assertTrue((pixels[xs, ys] == 0).all(), msg)
+
+        # And every other pixel matches the reference rasterizer
+        drawn = (pixels == 255).all(axis=-1)
+        del pixels
+        self.assertTrue(np.array_equal(drawn, expected))
 
     def todo_test_arc(self):
 
@@ -393,4 +543,5 @@ class DrawModuleTest(unittest.TestCase):
 ################################################################################
 
 if __name__ == '__main__':
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
     unittest.main()